@@ -1,33 +1,102 @@
-import librosa
-import soundfile as sf
+import subprocess
 import os
+import wave
+
+import numpy as np
+
+def _is_target_wav(input_file, target_sr):
+    """只读 WAV 头判断是否已经是 16kHz 单声道 PCM16，O(1) 不解码音频数据"""
+    if not input_file.lower().endswith('.wav'):
+        return False
+    try:
+        with wave.open(input_file, 'rb') as wf:
+            return (wf.getframerate() == target_sr
+                    and wf.getnchannels() == 1
+                    and wf.getsampwidth() == 2)
+    except Exception:
+        # 头解析不了（压缩WAV等）就老老实实走 ffmpeg
+        return False
 
 def convert_to_wav(input_file, target_sr=16000):
+    # 下载器通常已经产出目标格式，这时整个解码+编码环节都可以省掉
+    if _is_target_wav(input_file, target_sr):
+        return input_file
+
     filename = os.path.splitext(os.path.basename(input_file))[0]
     output_file = os.path.join(os.path.dirname(input_file), f"{filename}_converted.wav")
-    
+
     try:
-        # 1. 强制单声道 (mono=True 是默认值，但显式写出来更保险)
-        # librosa 会自动归一化数据到 -1~1 之间的 float32
-        audio_data, original_sr = librosa.load(input_file, sr=None, mono=True)
-        
-        # 2. 重采样
-        if original_sr != target_sr:
-            audio_data = librosa.resample(audio_data, orig_sr=original_sr, target_sr=target_sr)
-        
-        # 3. 保存为 PCM_16 (16位整数) 格式
-        # 很多 ASR 前端处理对 float 格式支持可能不如 int16 稳定
-        # soundfile 会自动处理 float 到 int16 的量化转换
-        sf.write(output_file, audio_data, target_sr, subtype='PCM_16')
-        
+        # 直接调用 ffmpeg 一次完成 解码 -> 单声道 -> 重采样 -> PCM16
+        # ffmpeg 内部是 C 级的流式处理 (SWR 重采样器)，
+        # 不需要像 librosa 那样把整段音频解码成 float32 读进 Python 内存
+        subprocess.run(
+            [
+                "ffmpeg", "-y",
+                "-i", input_file,
+                "-ac", "1",                 # 强制单声道
+                "-ar", str(target_sr),      # 重采样
+                "-acodec", "pcm_s16le",     # 16位整数，对 ASR 前端最稳
+                output_file,
+            ],
+            check=True,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+
         return output_file
+    except subprocess.CalledProcessError as e:
+        stderr_tail = e.stderr.decode(errors="ignore")[-500:] if e.stderr else str(e)
+        raise Exception(f"音频转换失败: {stderr_tail}")
     except Exception as e:
         raise Exception(f"音频转换失败: {str(e)}")
 
+def decode_to_array(input_file, target_sr=16000):
+    """
+    解码成 FunASR 可以直接消费的 float32 单声道数组
+
+    写中间 WAV 文件的话，FunASR 内部还要再解码一遍 —— 音频被解码了两次
+    外加一轮磁盘写读。让 ffmpeg 把裸 PCM 吐到 stdout，一次解码直接进内存。
+    """
+    # 下载器通常已经产出 16kHz 单声道 PCM16 WAV：
+    # 这种情况下连 ffmpeg 都不用起，stdlib 的 wave 直接把帧读出来就是裸 PCM
+    if _is_target_wav(input_file, target_sr):
+        try:
+            with wave.open(input_file, 'rb') as wf:
+                raw = wf.readframes(wf.getnframes())
+            return np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+        except Exception:
+            pass  # 读坏了就走 ffmpeg 兜底
+
+    try:
+        proc = subprocess.run(
+            [
+                "ffmpeg",
+                "-i", input_file,
+                "-f", "s16le",              # 裸 PCM，不要 WAV 头
+                "-ac", "1",
+                "-ar", str(target_sr),
+                "-",
+            ],
+            check=True,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        raw = proc.stdout
+
+        # int16 -> float32 归一化到 -1~1（FunASR 期望的输入格式）
+        return np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+    except subprocess.CalledProcessError as e:
+        stderr_tail = e.stderr.decode(errors="ignore")[-500:] if e.stderr else str(e)
+        raise Exception(f"音频解码失败: {stderr_tail}")
+    except Exception as e:
+        raise Exception(f"音频解码失败: {str(e)}")
+
 if __name__ == "__main__":
     # 测试
-    input_file = "/var/folders/sx/8rjxr_yj3wl_7cdggzqx_bvr0000gn/T/tmp40g506ey/audio.webm" 
-    
+    input_file = "/var/folders/sx/8rjxr_yj3wl_7cdggzqx_bvr0000gn/T/tmp40g506ey/audio.webm"
+
     if os.path.exists(input_file):
         try:
             output_file = convert_to_wav(input_file)
@@ -1,47 +1,117 @@
 import yt_dlp
 import os
+import sys
+import subprocess
 import tempfile
 
-def download_audio(video_url):
+def _download_audio_streaming(video_url, temp_dir):
     """
-    使用yt-dlp下载视频的音频
-    
-    Args:
-        video_url (str): 视频链接
-        
-    Returns:
-        str: 下载的音频文件路径
+    流式下载：yt-dlp 把音频字节直接写到管道，ffmpeg 边下边转码成 WAV
+
+    网络下载和音频转码占用的是不同资源（网络 vs CPU），
+    串行执行会白白浪费其中较短一段的时间；用管道把两者重叠起来，
+    长视频可以省掉整个 ffmpeg 的运行时间
+    """
+    out_wav = os.path.join(temp_dir, 'audio.wav')
+
+    # 用子进程跑 yt-dlp 输出到 stdout（进程内调用会和 Streamlit 劫持的 stdout 打架）
+    ydl_proc = subprocess.Popen(
+        [sys.executable, '-m', 'yt_dlp',
+         '-f', 'bestaudio/best',
+         '--quiet', '--no-warnings',
+         '-o', '-',
+         video_url],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    ffmpeg_proc = subprocess.Popen(
+        ['ffmpeg', '-y',
+         '-i', 'pipe:0',
+         '-ac', '1',
+         '-ar', '16000',
+         '-acodec', 'pcm_s16le',
+         out_wav],
+        stdin=ydl_proc.stdout,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    # 关闭父进程手里的读端，让 ffmpeg 能收到 EOF
+    ydl_proc.stdout.close()
+
+    ffmpeg_ret = ffmpeg_proc.wait()
+    ydl_ret = ydl_proc.wait()
+
+    if ydl_ret != 0 or ffmpeg_ret != 0 or not os.path.exists(out_wav):
+        raise Exception(f"流式下载失败 (yt-dlp={ydl_ret}, ffmpeg={ffmpeg_ret})")
+
+    return out_wav
+
+def _download_audio_postprocess(video_url, temp_dir):
+    """
+    兜底路径：传统的"先下载完、再由后处理器转码"的两段式流程
     """
-    # 创建临时目录用于存储下载的文件
-    temp_dir = tempfile.mkdtemp()
-    
     # yt-dlp配置
+    # 直接让后处理器输出 16kHz 单声道 PCM16 WAV，
+    # 避免先压成 MP3 再解码回 WAV 的多余一轮编解码（还省掉了 MP3 量化噪声）
+    # quiet/noprogress: 这个函数可能在后台线程里跑（与模型加载并行），
+    # 那边的 sys.stdout 被 Streamlit 的 logger 劫持着，
+    # 从非脚本线程往页面元素写东西会直接抛 NoSessionContext
     ydl_opts = {
         'format': 'bestaudio/best',
+        'quiet': True,
+        'noprogress': True,
+        'no_warnings': True,
         'postprocessors': [{
             'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '192',
+            'preferredcodec': 'wav',
         }],
         'postprocessor_args': [
-            '-ar', '16000'
+            '-ar', '16000',
+            '-ac', '1',
+            '-sample_fmt', 's16',
         ],
         'prefer_ffmpeg': True,
         'keepvideo': False,
         'outtmpl': os.path.join(temp_dir, 'audio.%(ext)s'),
     }
-    
+
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        # 下载音频
+        info_dict = ydl.extract_info(video_url, download=True)
+
+        # 获取下载的文件路径
+        downloaded_file = ydl.prepare_filename(info_dict)
+        # 因为使用了FFmpegExtractAudio后处理器，实际文件扩展名会变为wav
+        wav_file = downloaded_file.rsplit('.', 1)[0] + '.wav'
+
+        return wav_file
+
+def download_audio(video_url, out_dir=None):
+    """
+    使用yt-dlp下载视频的音频
+
+    Args:
+        video_url (str): 视频链接
+        out_dir (str): 输出目录；调用方传入可自动清理的临时目录，
+                       不传则退化为 mkdtemp（需自行清理）
+
+    Returns:
+        str: 下载的音频文件路径
+    """
+    # 创建临时目录用于存储下载的文件
+    temp_dir = out_dir if out_dir else tempfile.mkdtemp()
+
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            # 下载音频
-            info_dict = ydl.extract_info(video_url, download=True)
-            
-            # 获取下载的文件路径
-            downloaded_file = ydl.prepare_filename(info_dict)
-            # 因为使用了FFmpegExtractAudio后处理器，实际文件扩展名会变为mp3
-            mp3_file = downloaded_file.rsplit('.', 1)[0] + '.mp3'
-            
-            return mp3_file
+        # 优先走流式管道（下载与转码并行）
+        try:
+            return _download_audio_streaming(video_url, temp_dir)
+        except Exception as e:
+            # 直接写真正的系统终端：这里可能在后台线程里，
+            # 走被劫持的 stdout 会因为没有脚本上下文而抛 NoSessionContext，
+            # 把本该能兜底恢复的流式失败变成硬失败
+            if sys.__stdout__ is not None:
+                sys.__stdout__.write(f"⚠️ 流式下载不可用 ({e})，回退到普通下载\n")
+            return _download_audio_postprocess(video_url, temp_dir)
     except Exception as e:
         raise Exception(f"下载失败: {str(e)}")
 
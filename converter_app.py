@@ -2,14 +2,21 @@ import streamlit as st
 import tempfile
 import os
 import sys
-import torch
 import time
 import re
 
-from audio_downloader import download_audio
-from audio_converter import convert_to_wav
-from funasr import AutoModel
-from modelscope.hub.snapshot_download import snapshot_download
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# 让 tqdm 自己降低刷新频率（必须在 funasr 等库导入 tqdm 之前设置，
+# 它们都是懒加载的，放在模块顶部一定来得及）
+os.environ.setdefault("TQDM_MININTERVAL", "0.5")
+
+# 注意：torch / funasr / modelscope / yt-dlp 都是重型依赖，
+# 统一放到用到它们的函数里懒加载 —— Streamlit 每次控件交互都会重跑整个脚本，
+# 顶层 import 会把 CUDA 初始化等首次副作用算进每次页面加载里
 # ================= 配置区 =================
 # 你用到的三个模型 ID 和版本
 MODEL_CONFIG = {
@@ -17,20 +24,37 @@ MODEL_CONFIG = {
     "vad":  {"id": "iic/speech_fsmn_vad_zh-cn-16k-common-pytorch",  "ver": "v2.0.4"},
     "punc": {"id": "iic/punc_ct-transformer_zh-cn-common-vocab272727-pytorch", "ver": "v2.0.4"},
 }
+def _status(msg):
+    # 模型下载/加载期间的后台日志：直接写真正的系统终端，
+    # 绕开被劫持的 stdout（不用走 清洗 -> 缓冲 -> 网页重绘 这一整条链）。
+    # 这两个函数都有缓存，这些消息本来就只在冷启动出现
+    if sys.__stdout__ is not None:
+        sys.__stdout__.write(msg + "\n")
+
 # ================= 预下载/检查 =================
 @st.cache_data(show_spinner="正在检查本地模型完整性...")
 def check_and_download_models():
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from modelscope.hub.snapshot_download import snapshot_download
+
     local_paths = {}
-    print("----- 开始检查模型文件 -----")
+    _status("----- 开始检查模型文件 -----")
     try:
-        # 遍历三个模型进行检查
-        for key, cfg in MODEL_CONFIG.items():
-            # snapshot_download 会自动判断本地缓存
-            # 如果本地存在，它不会发起网络请求，直接返回路径，速度极快
-            path = snapshot_download(model_id=cfg["id"], revision=cfg["ver"])
-            local_paths[key] = path
-            print(f"✅ {key.upper()} 模型就绪: {path}")
-            
+        # 三个模型彼此独立、纯网络 IO（GIL 不碍事），并行拉取
+        # 冷启动的总耗时从"三个之和"变成"最大的那个"
+        # snapshot_download 会自动判断本地缓存
+        # 如果本地存在，它不会发起网络请求，直接返回路径，速度极快
+        with ThreadPoolExecutor(max_workers=len(MODEL_CONFIG)) as ex:
+            futures = {
+                ex.submit(snapshot_download, model_id=cfg["id"], revision=cfg["ver"]): key
+                for key, cfg in MODEL_CONFIG.items()
+            }
+            for fut in as_completed(futures):
+                key = futures[fut]
+                path = fut.result()
+                local_paths[key] = path
+                _status(f"✅ {key.upper()} 模型就绪: {path}")
+
     except Exception as e:
         st.error(f"模型下载失败，请检查网络或代理设置！\n报错信息: {e}")
         st.stop() # 停止运行后续代码
@@ -39,46 +63,102 @@ def check_and_download_models():
 # ================= 加载进显存（防卡顿核心） =================
 @st.cache_resource(show_spinner="正在加载神经网络到显存 (只加载一次)...")
 def load_funasr_engine(device_select="cuda"):
+    import torch
+    from funasr import AutoModel
+
     # 1. 先确保文件都在（引用上面的函数）
     paths = check_and_download_models()
-    
+
     # 2. 初始化重型对象
-    print("🚀 正在初始化 FunASR AutoModel...")
+    _status("🚀 正在初始化 FunASR AutoModel...")
     model = AutoModel(
         model=paths["asr"],
         model_revision=MODEL_CONFIG["asr"]["ver"],
         
         vad_model=paths["vad"],
         vad_model_revision=MODEL_CONFIG["vad"]["ver"],
-        
+        # 把单个语音段截断在 30s 以内：超长片段是显存峰值的来源，
+        # 截短后配合 batch_size_s，任意时长的视频都能以恒定显存在 GPU 上推理
+        vad_kwargs={"max_single_segment_time": 30000},
+
         punc_model=paths["punc"],
         punc_model_revision=MODEL_CONFIG["punc"]["ver"],
         
         device=device_select,
         num_workers=0, # 避免 Streamlit 多线程报错
     )
-    print("🎉 模型初始化完毕！")
+    # 显式切到 eval 模式，关掉 dropout 等训练期行为
+    if hasattr(model, "model") and hasattr(model.model, "eval"):
+        model.model.eval()
+
+    # CUDA 上尝试 torch.compile：把 encoder 里反复出现的 conv/attention
+    # 碎核融合掉，省显存往返。编译是尽力而为 —— 失败就按 eager 跑，
+    # 首次编译的开销由下面的预热推理吸收
+    if device_select == "cuda" and hasattr(torch, "compile"):
+        for attr in ("model", "vad_model", "punc_model"):
+            sub_model = getattr(model, attr, None)
+            if sub_model is None:
+                continue
+            try:
+                setattr(model, attr, torch.compile(
+                    sub_model, mode="reduce-overhead", fullgraph=False
+                ))
+                _status(f"⚡ torch.compile 已启用: {attr}")
+            except Exception as e:
+                _status(f"⚠️ torch.compile 跳过 {attr}: {e}")
+
+    # 用 1 秒静音做一次预热推理：cuDNN 算法选择、惰性权重物化这些
+    # 首次推理才发生的一次性开销都在这里付掉，而不是让用户第一条视频多等几秒
+    # (整个函数被 cache_resource 包着，预热每个进程只跑一次)
+    try:
+        _status("🔥 正在预热模型...")
+        silence = np.zeros(16000, dtype=np.float32)
+        model.generate(input=silence, fs=16000, disable_pbar=True)
+    except Exception as e:
+        # 预热失败不影响正常使用，只是首次推理会慢一点
+        _status(f"⚠️ 模型预热跳过: {e}")
+
+    _status("🎉 模型初始化完毕！")
     return model
 
-if torch.cuda.is_available():
-    device_select = "cuda"
-# elif torch.backends.mps.is_available(): # 实测Apple M4的mps稳定性不太行所以先注掉了
-#     device_select = "mps"
-else:
-    device_select = "cpu"
-model_instance = load_funasr_engine(device_select)
+@st.cache_resource(show_spinner=False)
+def detect_device():
+    # cuda.is_available() 会探测驱动（某些平台还会顺手初始化 CUDA 上下文），
+    # 缓存起来保证整个进程只探测一次
+    import torch
+
+    if torch.cuda.is_available():
+        # 允许 TF32 matmul：纯推理场景精度足够，Ampere+ 上吞吐明显更高
+        torch.set_float32_matmul_precision('high')
+        # 输入形状重复出现时让 cuDNN 自动选最优卷积算法
+        torch.backends.cudnn.benchmark = True
+        return "cuda"
+    # elif torch.backends.mps.is_available(): # 实测Apple M4的mps稳定性不太行所以先注掉了
+    #     return "mps"
+    return "cpu"
+
+# 这是一个能匹配几乎所有 ANSI 转义序列的正则表达式
+# 它能识别颜色 (\x1b[34m) 和光标移动 (\x1b[A) 等
+# 模块级编译一次，不用每次实例化 logger 都重新 compile
+_ANSI_ESCAPE_RE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
 
 # --- 核心组件：日志重定向类 ---
 class StreamlitLogger:
     def __init__(self, log_container):
         self.log_container = log_container
-        self.log_buffer = []
+        # 有界环形缓冲：append 是 O(1)，超过 20 行自动从左侧丢弃，
+        # 不需要每次 write 都切片复制一遍列表
+        self.log_buffer = deque(maxlen=20)
+        # 增量维护的展示字符串：append/丢弃时只做一次切片拼接，
+        # 免去每次渲染都 "".join 整个窗口
+        self.display_text = ""
+        # 渲染节流：tqdm 一秒能 write 上百次，每次都走一趟
+        # Streamlit 的 DOM 更新会把推理时间全耗在重绘上
+        self.last_flush = 0.0
+        # 节流窗口里攒了新内容但还没渲染时为 True
+        self._pending = False
         self.original_stdout = sys.stdout
         self.original_stderr = sys.stderr
-        
-        # 这是一个能匹配几乎所有 ANSI 转义序列的正则表达式
-        # 它能识别颜色 (\x1b[34m) 和光标移动 (\x1b[A) 等
-        self.ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
 
     def write(self, message):
         # 1. 仍然输出到后台终端 (保留原始带颜色的格式，方便你在 VSCode 里看)
@@ -87,8 +167,13 @@ class StreamlitLogger:
         # 2. 清洗数据给 Streamlit 显示
         
         # 第一步：去除 ANSI 颜色和控制符
-        clean_message = self.ansi_escape.sub('', message)
-        
+        # 大部分日志行根本不含转义序列，先用 memchr 级别的 in 判断做快速通道，
+        # 没有 ESC/CSI 字节就完全跳过正则
+        if '\x1B' in message or '\x9B' in message:
+            clean_message = _ANSI_ESCAPE_RE.sub('', message)
+        else:
+            clean_message = message
+
         # 第二步：处理回车符 \r
         # tqdm 喜欢用 \r 回到行首覆盖进度。在网页上我们把它变成换行 \n，
         # 这样进度条就会变成瀑布流（一行行显示），而不是挤在一起。
@@ -99,115 +184,206 @@ class StreamlitLogger:
         clean_message = clean_message.replace('[A', '')
 
         if clean_message.strip():
-            self.log_buffer.append(clean_message)
-            
-            # --- 性能优化 ---
-            # 只保留最后 20 行日志，避免网页越来越卡
-            if len(self.log_buffer) > 20:
-                self.log_buffer = self.log_buffer[-20:]
-            
-            # 显示清洗后的日志
-            self.log_container.code("".join(self.log_buffer), language="text")
+            self._append(clean_message)
+
+    def _append(self, clean_message):
+        # deque 满了会自动丢最左边一条，先把它从展示串里切掉
+        if len(self.log_buffer) == self.log_buffer.maxlen:
+            self.display_text = self.display_text[len(self.log_buffer[0]):]
+        self.log_buffer.append(clean_message)
+        self.display_text += clean_message
+
+        # --- 性能优化 ---
+        # 渲染节流：最多每 0.2 秒往网页推一次（一次 websocket 往返），
+        # 其余 write 只进缓冲并标记待渲染
+        self._pending = True
+        now = time.monotonic()
+        if now - self.last_flush > 0.2:
+            self._do_flush(now)
+
+    def _do_flush(self, now):
+        self._render()
+        self.last_flush = now
+        self._pending = False
+
+    def _pop_last(self):
+        # 弹出最后一条（给 TqdmSink 做原地覆盖用）
+        if self.log_buffer:
+            last = self.log_buffer.pop()
+            self.display_text = self.display_text[:len(self.display_text) - len(last)]
+
+    def _render(self):
+        # 显示清洗后的日志（display_text 已增量维护好最后 20 行）
+        self.log_container.code(self.display_text, language="text")
 
     def flush(self):
+        # flush 时把节流窗口里攒下的内容渲染出去，保证不会吞掉最后几行
+        if self._pending:
+            self._do_flush(time.monotonic())
         self.original_stdout.flush()
         self.original_stderr.flush()
 
-def format_time(ms):
-    """毫秒转SRT时间格式"""
-    seconds = ms / 1000
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    seconds = int(seconds % 60)
-    milliseconds = int(ms % 1000)
-    return f"{hours:02}:{minutes:02}:{seconds:02},{milliseconds:03}"
+class TqdmSink:
+    """stderr 专用的包装：tqdm 用 \\r 原地重绘进度条，
+    每一帧都当新行追加会让 20 行窗口全是同一根进度条的历史帧。
+    这里把连续的 \\r 重绘折叠成"覆盖缓冲区最后一行"。"""
+    def __init__(self, logger):
+        self.logger = logger
+        # 记录本 sink 最后追加的那一条：stdout/stderr 会交错写入共享缓冲，
+        # 只有缓冲区末尾确实还是我们的旧帧时才允许覆盖，
+        # 否则会误删中间插进来的正常日志行
+        self._last_frame = None
+
+    def write(self, message):
+        logger = self.logger
+        # 纯 \r 重绘帧（tqdm 的典型输出）：覆盖上一帧而不是追加
+        if '\r' in message and '\n' not in message:
+            logger.original_stderr.write(message)
+            # 同样的快速通道：无 ESC/CSI 字节就不跑正则
+            if '\x1B' in message or '\x9B' in message:
+                clean = _ANSI_ESCAPE_RE.sub('', message)
+            else:
+                clean = message
+            # 只保留最后一次重绘的内容
+            clean = clean.rsplit('\r', 1)[-1].replace('[A', '')
+            if clean.strip():
+                if (self._last_frame is not None
+                        and logger.log_buffer
+                        and logger.log_buffer[-1] is self._last_frame):
+                    logger._pop_last()
+                entry = clean + '\n'
+                logger._append(entry)
+                self._last_frame = entry
+            return
+        # 普通消息走原有清洗逻辑
+        self._last_frame = None
+        logger.write(message)
+
+    def flush(self):
+        self.logger.flush()
+
+def _format_times(ms_values):
+    """毫秒数组转SRT时间格式字符串列表
+
+    divmod 在 NumPy 的 C 循环里对整批 cue 一次算完，
+    不必每条字幕在 Python 层做四次标量整除
+    """
+    ms_values = np.asarray(ms_values, dtype=np.int64)
+    seconds, milliseconds = np.divmod(ms_values, 1000)
+    hours, seconds = np.divmod(seconds, 3600)
+    minutes, seconds = np.divmod(seconds, 60)
+    return [
+        f"{h:02}:{m:02}:{s:02},{ms:03}"
+        for h, m, s, ms in zip(
+            hours.tolist(), minutes.tolist(), seconds.tolist(), milliseconds.tolist()
+        )
+    ]
+
+# 断句字符表（模块级常量，不必每次调用重建）
+# 硬断句：句号、问号、感叹号、分号
+_HARD_BREAK_CHARS = frozenset("。？！；：?!;:\n")
+# 软断句：逗号、顿号、空格
+_SOFT_BREAK_CHARS = frozenset("，、, ")
+# 其他空白符：不消耗时间戳，但也不触发断句
+_WHITESPACE_CHARS = frozenset("\t\r\x0b\x0c　")
+# 对应的码点数组，直接给 np.isin 用
+_HARD_BREAK_CPS = np.array(sorted(ord(c) for c in _HARD_BREAK_CHARS), dtype=np.uint32)
+_SOFT_BREAK_CPS = np.array(sorted(ord(c) for c in _SOFT_BREAK_CHARS), dtype=np.uint32)
+_WHITESPACE_CPS = np.array(sorted(ord(c) for c in _WHITESPACE_CHARS), dtype=np.uint32)
 
 def generate_smart_srt(inference_result, min_length=10):
     """
     智能SRT生成：
     - 硬标点 (。？！)：强制换行
     - 软标点 (，、)：只有当前句长度超过 min_length 时才换行，否则合并
+
+    实现上用 NumPy 对整段文本做一次 C 级扫描找断点，
+    Python 层只在（少得多的）断点候选位置之间循环，
+    避免逐字符解释执行 + 字符串 += 的二次增长
     """
     # 1. 提取数据
     data = inference_result[0] if isinstance(inference_result, list) else inference_result
     text = data.get('text', '')
     ts_list = data.get('timestamp', [])
-    
-    # 2. 定义标点集合
-    # 硬断句：句号、问号、感叹号、分号
-    hard_break_chars = set("。？！；：?!;:\n")
-    # 软断句：逗号、顿号、空格
-    soft_break_chars = set("，、, ")
-    
-    srt_content = ""
-    sentence_idx = 1
-    ts_index = 0  # 时间戳指针
-    
-    # 当前行的状态缓存
-    curr_text = ""
-    curr_start = -1
-    curr_end = 0
-    
-    for char in text:
-        # --- A. 处理时间戳 (如果是有效文字) ---
-        is_punctuation = char in hard_break_chars or char in soft_break_chars or char.isspace()
-        
-        if not is_punctuation:
-            if ts_index < len(ts_list):
-                start, end = ts_list[ts_index]
-                # 如果是当前行的第一个字
-                if curr_start == -1:
-                    curr_start = start
-                # 更新当前行的结束时间
-                curr_end = end
-                ts_index += 1
-        
-        # --- B. 拼接字符 ---
-        curr_text += char
-        
-        # --- C. 判断是否断句 ---
-        should_flush = False
-        
-        # C1. 硬断句：遇到句号，必须断
-        if char in hard_break_chars:
-            should_flush = True
-            
-        # C2. 软断句：遇到逗号，看字数够不够
-        elif char in soft_break_chars:
-            # 只有当当前句长度 >= 设定的最小长度时，才断开
-            # 否则就忽略这个逗号，继续往后拼
-            if len(curr_text) >= min_length:
-                should_flush = True
-        
-        # --- D. 执行断句 ---
-        if should_flush and curr_text.strip():
+
+    if not text:
+        return ""
+
+    # 2. 一次性把文本转成码点数组，向量化打标（字符表见模块级常量）
+    cp = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+    is_hard = np.isin(cp, _HARD_BREAK_CPS)
+    is_soft = np.isin(cp, _SOFT_BREAK_CPS)
+    # 标点和空白不消耗时间戳，其余字符按出现顺序对应 ts_list 的条目
+    is_punct = is_hard | is_soft | np.isin(cp, _WHITESPACE_CPS)
+
+    # 4. 时间戳映射：cum_nonpunct[i] = text[:i+1] 中消耗时间戳的字符数
+    cum_nonpunct = np.cumsum(~is_punct)
+    ts_arr = np.asarray(ts_list, dtype=np.int64).reshape(-1, 2)
+    ts_len = len(ts_arr)
+
+    # 先攒 (start_ms, end_ms, 文本) 三元组，
+    # 时间格式化留到最后对整批 cue 做向量化 divmod
+    cues = []
+    seg_start = 0   # 当前行在 text 中的起始下标
+    last_end = 0    # 最近一次有效的结束时间（兜底用）
+
+    def _emit(seg_stop):
+        # 输出 text[seg_start:seg_stop] 为一条字幕，返回是否真的输出了
+        nonlocal seg_start, last_end
+        seg_text = text[seg_start:seg_stop].strip()
+        if not seg_text:
+            # 全是空白：不输出也不重置，继续往后拼（与逐字符版行为一致）
+            return False
+
+        # 该行消耗的时间戳区间 [k0, k1]
+        k0 = int(cum_nonpunct[seg_start - 1]) if seg_start > 0 else 0
+        k1 = int(cum_nonpunct[seg_stop - 1]) - 1
+        if k0 < ts_len and k1 >= k0:
+            curr_start = int(ts_arr[k0, 0])
+            curr_end = int(ts_arr[min(k1, ts_len - 1), 1])
+            last_end = curr_end
+        else:
             # 防御：万一全是标点或没时间戳
-            if curr_start == -1: 
-                curr_start = curr_end # 兜底
-                
-            srt_content += f"{sentence_idx}\n"
-            srt_content += f"{format_time(curr_start)} --> {format_time(curr_end)}\n"
-            srt_content += f"{curr_text.strip()}\n\n" # strip去掉首尾空格
-            
-            sentence_idx += 1
-            # 重置状态
-            curr_text = ""
-            curr_start = -1
-            
-    # --- E. 处理残留文本 ---
-    if curr_text.strip():
-        if curr_start == -1: curr_start = curr_end
-        srt_content += f"{sentence_idx}\n"
-        srt_content += f"{format_time(curr_start)} --> {format_time(curr_end)}\n"
-        srt_content += f"{curr_text.strip()}\n\n"
-        
-    return srt_content
+            curr_start = curr_end = last_end
+
+        cues.append((curr_start, curr_end, seg_text))
+        seg_start = seg_stop
+        return True
+
+    # 5. 只在断点候选位置循环（数量远小于字符数）
+    for i in np.flatnonzero(is_hard | is_soft):
+        i = int(i)
+        # 硬断句：必须断；软断句：当前行够长才断
+        if is_hard[i] or (i + 1 - seg_start) >= min_length:
+            _emit(i + 1)
+
+    # --- 处理残留文本 ---
+    _emit(len(text))
+
+    if not cues:
+        return ""
+
+    # 整批格式化时间戳，再一次 join 组装输出
+    start_strs = _format_times([c[0] for c in cues])
+    end_strs = _format_times([c[1] for c in cues])
+    return "".join(
+        f"{idx}\n{start_str} --> {end_str}\n{seg_text}\n\n"
+        for idx, (start_str, end_str, (_, _, seg_text))
+        in enumerate(zip(start_strs, end_strs, cues), start=1)
+    )
 
 def update_srt_by_slider():
     min_len = st.session_state.srt_min_len_slider
     if "raw_res" in st.session_state:
-        # 1. 生成新内容
-        new_content = generate_smart_srt(st.session_state.raw_res, min_length=min_len)
+        # 1. 生成新内容（按识别结果+字数阈值缓存：
+        #    滑块拖回到试过的值时直接命中，不必重新扫一遍全文）
+        cache = st.session_state.setdefault("_srt_cache", {})
+        key = (id(st.session_state.raw_res), min_len)
+        new_content = cache.get(key)
+        if new_content is None:
+            new_content = generate_smart_srt(st.session_state.raw_res, min_length=min_len)
+            cache[key] = new_content
         # 2. 更新核心数据
         st.session_state.srt_result = new_content
         
@@ -251,7 +427,14 @@ video_url = clean_url(video_url_raw)
 # 处理按钮
 if st.button("开始处理", type="primary") and video_url:
     st.session_state.is_processed = False
-    
+
+    # 重型依赖只在真正点了"开始处理"时才导入：
+    # 拖滑块/改链接触发的 rerun 完全不会碰到 torch / yt-dlp
+    import torch
+    from audio_downloader import download_audio
+    from audio_converter import decode_to_array
+
+
     # 1. 创建一个日志显示区域（默认折叠）
     with st.expander("查看详细运行日志 (Terminal Output)", expanded=True):
         log_placeholder = st.empty()
@@ -263,39 +446,74 @@ if st.button("开始处理", type="primary") and video_url:
     with st.status("正在初始化任务...", expanded=True) as status:
         
         # --- 关键：开始劫持 stdout ---
-        sys.stdout = logger 
-        sys.stderr = logger
+        # stderr 走 TqdmSink：进度条的 \r 重绘会原地覆盖而不是刷屏
+        sys.stdout = logger
+        sys.stderr = TqdmSink(logger)
         
         try:
-            # 步骤1: 下载音频
-            status.update(label="正在下载音频 (yt-dlp)...", state="running")
-            st.write("🚀 开始调用下载工具...") # 这行字会显示在日志框里
-            
-            # 注意：如果 download_audio 内部使用了 print，会被捕获。
-            # 如果它使用 subprocess 直接输出到系统终端，可能无法被捕获（见下方说明）。
-            audio_file = download_audio(video_url)
-            st.write(f"✅ 下载完成: {os.path.basename(audio_file)}")
-            
-            # 步骤2: 转换音频格式
-            status.update(label="正在转换音频格式 (ffmpeg)...", state="running")
-            wav_file = convert_to_wav(audio_file)
-            st.write(f"✅ 格式转换完成: {os.path.basename(wav_file)}")
+            # 整条流水线的中间产物都放在这个临时目录里，
+            # with 退出时整个目录连带音频文件一起删掉（以前 mkdtemp 的目录会泄漏在磁盘上）
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                # 步骤1+2: 下载音频（后台线程）与加载模型并行
+                # 网络下载和模型加载占用的资源完全不相干，
+                # 没必要等下载完才开始加载（冷启动时两件事都要几十秒）
+                status.update(label="正在下载音频 + 加载模型...", state="running")
+                st.write("🚀 开始调用下载工具...") # 这行字会显示在日志框里
 
-            # 步骤3: 加载模型
-            status.update(label="正在加载 FunASR 模型...", state="running")
-            
-            st.write(f"⚙️ 检测到计算设备: {device_select}")
-            st.write("✅ 模型加载成功")
+                # 注意：如果 download_audio 内部使用了 print，会被捕获。
+                # 如果它使用 subprocess 直接输出到系统终端，可能无法被捕获（见下方说明）。
+                with ThreadPoolExecutor(max_workers=1) as pipeline_ex:
+                    download_future = pipeline_ex.submit(
+                        download_audio, video_url, out_dir=tmp_dir
+                    )
 
-            # 步骤4: 执行语音识别
-            status.update(label="正在进行语音识别 (Inference)...", state="running")
-            
-            # FunASR 的 generate 内部通常会有进度条打印，这里会被捕获
-            res = model_instance.generate(input=wav_file, return_sentence_timestamp=True)
-            st.session_state.raw_res = res 
-            st.write("✅ 识别推理结束")
+                    # 下载在后台跑，主线程同时把模型拉起来
+                    # (cache_resource 保证只有首次会真的加载)
+                    device_select = detect_device()
+                    st.write(f"⚙️ 检测到计算设备: {device_select}")
+                    model_instance = load_funasr_engine(device_select)
+                    st.write("✅ 模型加载成功")
+
+                    audio_file = download_future.result()
+                st.write(f"✅ 下载完成: {os.path.basename(audio_file)}")
+
+                # 步骤3: 解码音频到内存
+                # 直接解码成 float32 数组喂给 FunASR，
+                # 省掉中间 WAV 的一次编码 + FunASR 内部的一次再解码
+                status.update(label="正在解码音频 (ffmpeg)...", state="running")
+                speech = decode_to_array(audio_file, target_sr=16000)
+                st.write(f"✅ 音频解码完成: {len(speech) / 16000:.1f} 秒")
 
-            # 保存结果
+                # 步骤4: 执行语音识别
+                status.update(label="正在进行语音识别 (Inference)...", state="running")
+
+                # FunASR 的 generate 内部通常会有进度条打印，这里会被捕获
+                # inference_mode 关掉 autograd 的版本计数等簿记，纯推理白赚内存和速度
+                # batch_size_s 让 FunASR 把 VAD 切出的片段攒成批一起过 ASR，
+                # 不然长视频的几百个片段会逐个串行跑（GPU 利用率很低）
+                # autocast 只在 CUDA 上开 fp16：权重带宽减半、tensor core 吞吐翻倍
+                # MPS/CPU 保持 fp32（MPS 的 fp16 conv/attention 回退实测有坑）
+                with torch.inference_mode(), torch.autocast(
+                    device_type="cuda",
+                    dtype=torch.float16,
+                    enabled=(device_select == "cuda"),
+                ):
+                    # disable_pbar: st.status 已经是进度 UI 了，
+                    # tqdm 的每一帧重绘都要经过劫持的 stderr -> 清洗 -> websocket，
+                    # 直接关掉是最省的
+                    res = model_instance.generate(
+                        input=speech,
+                        fs=16000,
+                        return_sentence_timestamp=True,
+                        batch_size_s=300,
+                        disable_pbar=True,
+                    )
+                st.session_state.raw_res = res
+                # 新视频来了，旧的 SRT 缓存全部作废
+                st.session_state._srt_cache = {}
+                st.write("✅ 识别推理结束")
+
+            # 保存结果（出了 with，临时音频此时已经自动清理）
             st.session_state.transcription_result = res[0]['text']
             try:
                 st.session_state.srt_result = generate_smart_srt(res)
@@ -305,14 +523,6 @@ if st.button("开始处理", type="primary") and video_url:
                 st.session_state.srt_result = ""
             st.session_state.is_processed = True
 
-            # 清理临时文件
-            try:
-                st.write("🧹 清理临时文件...")
-                os.remove(audio_file)
-                os.remove(wav_file)
-            except Exception as e:
-                st.write(f"⚠️ 清理文件警告: {e}")
-
             # 更新最终状态
             status.update(label="🎉 处理全部完成！", state="complete", expanded=False)
 
@@ -397,11 +607,26 @@ if st.session_state.is_processed:
         else:
             st.caption("ℹ️ 当前为纯文本模式，编辑内容将保存为 .txt 格式")
     with col_act_2:
-        st.download_button(
-            label=f"📥 导出 {current_filename}",
-            data=edited_content,
-            file_name=current_filename,
-            mime="text/plain",
-            type="primary",
-            use_container_width=True
+        # 导出内容落盘到临时文件，再以文件句柄交给 download_button：
+        # 多小时转写的字符串可达数 MB，直接传字符串会在 session_state 之外
+        # 再复制一份挂在按钮上，每次 rerun 都跟着序列化。
+        # 内容没变时（绝大多数 rerun）连文件都不用重写
+        export_path = os.path.join(
+            tempfile.gettempdir(),
+            f"v2t_export_{transcript_md5[:10]}{os.path.splitext(current_filename)[1]}"
         )
+        export_sig = (widget_key, hash(edited_content))
+        if st.session_state.get("_export_sig") != export_sig:
+            with open(export_path, 'w', encoding='utf-8') as f:
+                f.write(edited_content)
+            st.session_state._export_sig = export_sig
+            st.session_state._export_path = export_path
+        with open(st.session_state._export_path, 'rb') as export_file:
+            st.download_button(
+                label=f"📥 导出 {current_filename}",
+                data=export_file,
+                file_name=current_filename,
+                mime="text/plain",
+                type="primary",
+                use_container_width=True
+            )